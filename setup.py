@@ -0,0 +1,11 @@
+# setup.py
+# Builds the optional compiled distance_sq function (src/_distance.pyx). Run "python setup.py build_ext --inplace" from
+# this directory; everything else in the project runs without a build step.
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+extensions = [
+    Extension("src._distance", ["src/_distance.pyx"], extra_compile_args=["-O3", "-march=native", "-ffast-math"]),
+]
+
+setup(ext_modules=cythonize(extensions, language_level=3))
@@ -39,16 +39,17 @@ class CondensedKNN(KNN):
                     # If first one, assume correctly classified and add input
                     condensed_training_set.append(example)
 
-        condensed_data = DataSet(condensed_training_set, original_data.class_col, original_data.attr_cols)
+        condensed_data = DataSet(condensed_training_set, original_data.class_col, original_data.attr_cols,
+                                 workers=original_data.workers)
         return condensed_data
     
     def calculate_closest_prototype(self, noncondensed_ele, condensed_training_set):
         """Finds the closest prototype to this element"""
-        min_dist_prototype = self.training_data.distance(noncondensed_ele, condensed_training_set[0])  # Initialize min distance
+        min_dist_prototype = self.training_data.distance_sq(noncondensed_ele, condensed_training_set[0])  # Initialize min distance
         closest_prototype = condensed_training_set[0]
         # Loop through condensed training set to find the closest prototype
         for j in range(1, len(condensed_training_set) - 1):
-                    distance = self.training_data.distance(noncondensed_ele, condensed_training_set[j])
+                    distance = self.training_data.distance_sq(noncondensed_ele, condensed_training_set[j])
                     if distance < min_dist_prototype:
                         min_dist_prototype = distance
                         closest_prototype = condensed_training_set[j]
@@ -2,7 +2,7 @@
 # Implementation of edited KNN algorithm, which we create as a subclass of the KNN class.
 
 from src.algorithms.knn import KNN
-import src.util as util
+import numpy as np
 import src.datasets.data_set as ds
 import src.loss as loss
 
@@ -16,28 +16,19 @@ class EditedKNN(KNN):
         self.training_data = training_data.copy()
         self.find_edited_data()
 
-    # Updates the edit_training_data variable to the edited data_set, that is the data_set with unnecessary
-    # vectors removed
+    # Updates the edit_training_data variable to the edited data_set, that is the data_set with noisy vectors removed.
+    # Each example is classified by a majority vote of its k nearest neighbors among the other examples, and only the
+    # examples that are classified correctly are kept (Wilson editing). Every example is voted on at once, using the
+    # leave-one-out neighbors of the whole training set.
     def find_edited_data(self):
-        counter = 0
-        length = len(self.training_data.data)
-        while True:
-            if counter > length:
-                break
-            counter += 1
-
-            # prev_accuracy = self.get_validation_accuracy()
-            example = self.training_data.data.pop(0)
-            # new_accuracy = self.get_validation_accuracy()
-            if util.get_highest_class(self.run(example)) != example[self.training_data.class_col]:
-                self.training_data.data.append(example)
-            else:
-                length -= 1
-                counter = 0
-
-
-
-
-
-
-
+        data = self.training_data
+        # Each class is replaced by an integer code so that the votes can be counted with numpy.
+        class_codes = np.unique([row[data.class_col] for row in data.data], return_inverse=True)[1]
+        neighbors = data.leave_one_out_neighbors(self.k)
+        # An example with no other examples to compare against is always kept.
+        if neighbors.shape[1] == 0:
+            return
+        # votes[i][c] is the number of neighbors of example i that have the class with code c.
+        votes = (class_codes[neighbors][:, :, np.newaxis] == np.arange(class_codes.max() + 1)).sum(axis=1)
+        keep = votes.argmax(axis=1) == class_codes
+        self.training_data = data.subset(np.flatnonzero(keep))
@@ -95,7 +95,7 @@ class KMeans:
         # Distance to the closest centroid seen so far.
         min_dist = None
         for i in range(len(centroids)):
-            dist = self.training_data.distance(centroids[i], obs)
+            dist = self.training_data.distance_sq(centroids[i], obs)
             if closest_centroid_i is None or dist < min_dist:
                 closest_centroid_i = i
                 min_dist = dist
@@ -174,3 +174,7 @@ class KMeans:
     def run(self, example):
         closest_centroid_i = self.find_closest_centroid(example, self.centroids)
         return self.cluster_classes[closest_centroid_i]
+
+    # Classifies a list of examples, returning a list of class distributions (one for each example).
+    def run_all(self, examples):
+        return [self.run(example) for example in examples]
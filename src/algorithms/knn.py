@@ -16,34 +16,20 @@ class KNN:
 
     # Returns a list of training examples that are the k-closest neighbors to the given observation.
     def find_closest_neighbors(self, observation):
-        # Initialize k_smallest to be a list of 'None's. After the for loop is finished it should contain k tuples
-        # representing the k-nearest neighbors to the observation. The first position is the distance and the second
-        # position is the example itself.
-        k_smallest = [None for i in range(self.k)]
-        # Stores the index of either (1) the first None value or (2) the largest item if no None's are present.
-        max_index = 0
-        # Iterate across each example in the training data...
-        for example in self.training_data.data:
-            dist = self.training_data.distance(example, observation)
-            # ...filling in any None values in k_smallest or replacing any examples with larger distances.
-            if k_smallest[max_index] is None or k_smallest[max_index][0] > dist:
-                k_smallest[max_index] = (dist, example)
-                # We also need to re-calculate the max_index given the current k_smallest list.
-                for i in range(len(k_smallest)):
-                    # If a None is encountered, always set it as max_index (we want remove all Nones right away)
-                    if k_smallest[i] is None:
-                        max_index = i
-                        break
-                    # Otherwise, try to find the maximum index if there are no None's.
-                    if k_smallest[i][0] > k_smallest[max_index][0]:
-                        max_index = i
-        self.last_nearest_neighbors = k_smallest
-        # Lastly, we want k_smallest to only store the examples themselves, no distances.
-        k_smallest_examples = []
-        for i in range(len(k_smallest)):
-            if k_smallest[i] is not None:
-                k_smallest_examples.append(k_smallest[i][1])
-        return k_smallest_examples
+        return self.find_all_closest_neighbors([observation])[0]
+
+    # Returns a list containing, for each of the given observations, the list of the k-closest training examples. All
+    # of the observations are searched for together (see DataSet.nearest_neighbors).
+    def find_all_closest_neighbors(self, observations):
+        distances, indices = self.training_data.nearest_neighbors(observations, self.k)
+
+        all_neighbors = []
+        for row_distances, row_indices in zip(distances, indices):
+            # We store (distance, example) tuples so that the neighbors from the last search can be inspected.
+            neighbors = [self.training_data.data[i] for i in row_indices]
+            self.last_nearest_neighbors = list(zip(row_distances, neighbors))
+            all_neighbors.append(neighbors)
+        return all_neighbors
 
     # Input an example test, output probability map of class
     def run(self, example):
@@ -51,5 +37,10 @@ class KNN:
         probability = util.calculate_class_distribution(k_closest, self.training_data.class_col)
         return probability
 
-
-
+    # Input a list of test examples, output a list of probability maps of class (one for each example). All of the
+    # examples are searched for together, which is faster than calling run repeatedly.
+    def run_all(self, examples):
+        probabilities = []
+        for k_closest in self.find_all_closest_neighbors(examples):
+            probabilities.append(util.calculate_class_distribution(k_closest, self.training_data.class_col))
+        return probabilities
@@ -86,7 +86,7 @@ class PamNN:
         # Distance to the closest centroid seen so far.
         min_dist = None
         for i in range(len(medoids)):
-            dist = self.training_data.distance(medoids[i], obs)
+            dist = self.training_data.distance_sq(medoids[i], obs)
             if closest_medoid_i is None or dist < min_dist:
                 closest_medoid_i = i
                 min_dist = dist
@@ -124,4 +124,8 @@ class PamNN:
     # point and then classify it according to the probability distribution of that cluster.
     def run(self, example):
         closest_centroid_i = self.find_closest_medoid(example, self.medoids)
-        return self.cluster_classes[closest_centroid_i]
\ No newline at end of file
+        return self.cluster_classes[closest_centroid_i]
+
+    # Classifies a list of examples, returning a list of class distributions (one for each example).
+    def run_all(self, examples):
+        return [self.run(example) for example in examples]
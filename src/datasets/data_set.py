@@ -1,10 +1,21 @@
 # data_set.py
 # Includes a class for defining a DataSet object that can be used in our algorithms. Also includes a few functions for
 # opening the data sets used in our experimental design.
-import random
+import functools
 import math
+import os
+import zipfile
+import numpy as np
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
 import src.util as util
 
+# The compiled distance function is optional, since it has to be built first (see setup.py).
+try:
+    from src._distance import mixed_distance_sq
+except ImportError:
+    mixed_distance_sq = None
+
 ABALONE_DATA_FILE = "../data/abalone.data"
 CAR_DATA_FILE = "../data/car.data"
 FOREST_FIRE_DATA_FILE = "../data/forestfires.data"
@@ -12,140 +23,436 @@ MACHINE_DATA_FILE = "../data/machine.data"
 SEGMENTATION_DATA_FILE = "../data/segmentation.data"
 WINE_DATA_FILE = "../data/winequality.data"
 
+# Preprocessed data sets are cached next to their data file, with this added to the end of the filename. The version is
+# saved in the cache, and must be increased whenever the preprocessing changes so that old caches are not used.
+CACHE_EXTENSION = ".cache.npz"
+CACHE_VERSION = 1
+
+# String attributes are one-hot encoded for the k-d tree. Scaling the one-hot values by this amount means two different
+# strings are a squared distance of exactly 1 apart, matching the distance function.
+ONE_HOT_SCALE = math.sqrt(0.5)
+# k-d trees stop beating a brute force search once the points have more than about this many dimensions.
+KD_TREE_MAX_DIMS = 20
+# Leave-one-out searches over more rows than this use the k-d tree, since a brute force search takes time proportional
+# to the square of the number of rows.
+LEAVE_ONE_OUT_MATRIX_MAX_ROWS = 10000
+# Brute force leave-one-out searches calculate the distances for this many rows at a time, so only a block of the
+# distance matrix is held in memory rather than the whole matrix.
+LEAVE_ONE_OUT_BLOCK_ROWS = 1024
+
+
+# The numeric attribute matrix is stored as 32-bit floats. After normalization the values are z-scores, so the extra
+# precision of 64-bit floats is not needed, and halving the size of the matrix makes the distance calculations faster.
+NUM_MATRIX_DTYPE = np.float32
+
+
+# Returns the smallest signed integer type that can hold the codes for a column with the given number of categories. It
+# must be signed since the code -1 is used for strings that are not one of the categories.
+def code_dtype(num_categories):
+    if num_categories <= np.iinfo(np.int8).max:
+        return np.int8
+    if num_categories <= np.iinfo(np.int16).max:
+        return np.int16
+    return np.int32
+
 
 # The DataSet class encapsulates a simple 2D list of our data (where each row is a data point). On top of this, it
 # includes other meta information such as the class column, attribute columns, and filename. It also provides
 # functionality for doing cross validation, normalization of attributes, replacement of attribute values, and a distance
-# function.
+# function. Alongside the 2D list, the attribute columns are kept as two numpy matrices so that distances to many rows
+# at once can be calculated without looping in Python. One holds the numeric attributes, and the other holds the string
+# (categorical) attributes as small integer codes. These matrices are built lazily and thrown away whenever one of the
+# methods below changes the data.
 class DataSet:
 
     # Constructs a new data set object using a filename. In addition, the column of the class and a list of columns of
     # the attributes must be specified. Note that the underlying 2D list is not reduced to just the attributes and
     # classes. For example, if you run get_data, it will return a 2D list with all of the columns present, even if a
     # column is neither an attribute or class (i.e. an unused column). To ensure that you are working with the right
-    # columns, iterate using the attr_cols or class_col field.
-    def __init__(self, data, class_col, attr_cols, filename=""):
+    # columns, iterate using the attr_cols or class_col field. A seed can be given to make shuffling and sampling
+    # reproducible. The k-d tree searches use the given number of threads (-1 uses every CPU core); code that already
+    # runs data sets in parallel processes should use 1 so the machine is not oversubscribed.
+    def __init__(self, data, class_col, attr_cols, filename="", seed=None, workers=-1):
         self.data = data
         self.class_col = class_col
         self.attr_cols = attr_cols
         self.filename = filename
-
-    # Creates a copy of the data set -> prevents issues with mutability.
+        self.workers = workers
+        self._rng = np.random.default_rng(seed)
+        # The column types are worked out the first time they are needed, since the data may still contain header rows.
+        self._clear_col_types()
+        self._invalidate()
+
+    # Creates a copy of the data set -> prevents issues with mutability. The rows themselves are shared with the copy,
+    # which is safe since the methods that change values build new rows instead of writing into the old ones. The copy
+    # also shares the cached column types, attribute matrices and k-d tree instead of building its own.
     def copy(self):
-        return DataSet(self.data.copy(), self.class_col, self.attr_cols.copy(), self.filename)
+        copy = DataSet(self.data.copy(), self.class_col, self.attr_cols.copy(), self.filename, workers=self.workers)
+        # The copy draws from the same random generator, so a seeded data set stays reproducible.
+        copy._rng = self._rng
+        copy._str_attr_cols = self._str_attr_cols
+        copy._num_attr_cols = self._num_attr_cols
+        copy._ordered_str_attr_cols = self._ordered_str_attr_cols
+        if self._num_matrix is not None:
+            copy._num_matrix = self._num_matrix
+            copy._cat_matrix = self._cat_matrix
+            copy._categories = self._categories
+        copy._index = self._index
+        return copy
 
     # Returns the data as a 2D list.
     def get_data(self):
         return self.data
 
-    # Returns a list of columns (indices) that are string values, not numeric. The return value of this function will
+    # Clears the cached attribute matrices. Must be called whenever self.data is changed so that the caches are rebuilt
+    # the next time they are needed.
+    def _invalidate(self):
+        self._num_matrix = None
+        self._cat_matrix = None
+        self._categories = None
+        self._index = None
+
+    # Makes sure the attribute matrices are laid out contiguously in memory (row by row), reallocating them if they are
+    # not. cdist and the compiled kernels read the rows with vectorized loads, which need a stride of one element. This
+    # is called at the end of every method that sets the matrices.
+    def _finalize(self):
+        if self._num_matrix is not None:
+            self._num_matrix = np.ascontiguousarray(self._num_matrix)
+            self._cat_matrix = np.ascontiguousarray(self._cat_matrix)
+
+    # Clears the cached column types. Must be called whenever the type of a column may have changed, so that they are
+    # worked out again the next time they are needed (by then the data may no longer be empty).
+    def _clear_col_types(self):
+        self._str_attr_cols = None
+        self._num_attr_cols = None
+        self._ordered_str_attr_cols = None
+
+    # Works out which attribute columns hold strings and which hold numbers, using the first row of the data. The string
+    # columns are kept in a frozenset so that checking whether a column is a string column is a constant time lookup.
+    def _refresh_col_types(self):
+        self._str_attr_cols = frozenset(c for c in self.attr_cols if isinstance(self.data[0][c], str))
+        self._num_attr_cols = tuple(c for c in self.attr_cols if c not in self._str_attr_cols)
+        self._ordered_str_attr_cols = tuple(c for c in self.attr_cols if c in self._str_attr_cols)
+
+    # Returns a set of columns (indices) that are string values, not numeric. The return value of this function will
     # change depending on the usage of the convert_to_float method.
     def get_str_attr_cols(self):
-        str_attr_cols = []
-        for attr_col in self.attr_cols:
-            if isinstance(self.data[0][attr_col], str):
-                str_attr_cols.append(attr_col)
-        return str_attr_cols
+        if self._str_attr_cols is None:
+            self._refresh_col_types()
+        return self._str_attr_cols
+
+    # Returns a tuple of columns (indices) that are numeric values. This is the complement of get_str_attr_cols within
+    # the attribute columns.
+    def get_num_attr_cols(self):
+        if self._num_attr_cols is None:
+            self._refresh_col_types()
+        return self._num_attr_cols
+
+    # Returns a 2D numpy array of the numeric attributes, where row i holds the numeric attributes of self.data[i].
+    def get_num_matrix(self):
+        if self._num_matrix is None:
+            self._build_matrices()
+        return self._num_matrix
+
+    # Returns a 2D numpy array of the string attributes as integer codes, where row i holds the codes of the string
+    # attributes of self.data[i]. Codes are small integers, so comparing them is much cheaper than comparing strings.
+    def get_cat_matrix(self):
+        if self._cat_matrix is None:
+            self._build_matrices()
+        return self._cat_matrix
+
+    # Returns a list with a dictionary for each string attribute (in the same order as attr_cols), mapping each string
+    # seen in the data set to its integer code.
+    def get_categories(self):
+        if self._categories is None:
+            self._build_matrices()
+        return self._categories
+
+    # Builds the numeric and categorical matrices of the data set. The codes for each string attribute are assigned in
+    # the order the strings first appear in the data.
+    def _build_matrices(self):
+        self._categories = []
+        for col in self.get_ordered_str_attr_cols():
+            values = dict.fromkeys(row[col] for row in self.data)
+            self._categories.append({value: code for code, value in enumerate(values)})
+        self._num_matrix, self._cat_matrix = self.to_matrices(self.data)
+        self._finalize()
+
+    # Returns a tuple of the string attribute columns, in the same order as attr_cols, so that every matrix has its
+    # columns in the same order.
+    def get_ordered_str_attr_cols(self):
+        if self._ordered_str_attr_cols is None:
+            self._refresh_col_types()
+        return self._ordered_str_attr_cols
+
+    # Converts a list of observations (in the same format as the data set) into a numeric matrix and a categorical matrix
+    # holding just the attribute columns. Strings are coded using the categories of this data set; a string that is not
+    # one of them is given the code -1, which does not match any row of the data set.
+    def to_matrices(self, observations):
+        num_cols = self.get_num_attr_cols()
+        num_matrix = np.asarray([[obs[c] for c in num_cols] for obs in observations], dtype=NUM_MATRIX_DTYPE)
+        num_matrix = num_matrix.reshape(len(observations), len(num_cols))
+
+        categories = self.get_categories()
+        dtype = code_dtype(max((len(values) for values in categories), default=0))
+        cat_matrix = np.empty((len(observations), len(categories)), dtype=dtype)
+        for i, col in enumerate(self.get_ordered_str_attr_cols()):
+            cat_matrix[:, i] = [categories[i].get(obs[col], -1) for obs in observations]
+        return num_matrix, cat_matrix
+
+    # Returns a 2D numpy array where entry [i][j] is the distance from observations[i] to self.data[j]. All of the
+    # distances are calculated in one pass by scipy's cdist, using squared euclidean distance for the numeric attributes
+    # and hamming distance (scaled back up to a count of mismatches) for the string attributes. If squared is True, the
+    # squared distances are returned instead, which is enough when the distances are only used to rank rows.
+    def distance_matrix(self, observations, squared=False):
+        obs_num, obs_cat = self.to_matrices(observations)
+        sums = cdist(obs_num, self.get_num_matrix(), 'sqeuclidean')
+        num_str_cols = len(self.get_str_attr_cols())
+        if num_str_cols:
+            sums += cdist(obs_cat, self.get_cat_matrix(), 'hamming') * num_str_cols
+        if squared:
+            return sums
+        return np.sqrt(sums)
+
+    # Finds the k nearest rows to each of the given observations by brute force. Returns two 2D numpy arrays, holding
+    # the distances and the row indices of the neighbors, sorted from nearest to farthest. Only the k smallest distances
+    # of each row of the distance matrix are sorted; np.argpartition finds them in linear time. The neighbors are ranked
+    # by squared distance, and the square root is only taken of the k distances that are returned.
+    def knn_indices(self, observations, k):
+        distances = self.distance_matrix(observations, squared=True)
+        k = min(k, len(self.data))
+        if k < len(self.data):
+            nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            nearest = np.tile(np.arange(len(self.data)), (len(observations), 1))
+        order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1, kind='stable')
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        return np.sqrt(np.take_along_axis(distances, nearest, axis=1)), nearest
+
+    # Finds the k nearest rows to each of the given observations, in the same format as knn_indices. The k-d tree is
+    # used unless the points have too many dimensions for it to help, in which case a brute force search is done.
+    def nearest_neighbors(self, observations, k):
+        k = min(k, len(self.data))
+        if self.get_embed_dims() > KD_TREE_MAX_DIMS:
+            return self.knn_indices(observations, k)
+        distances, indices = self.get_index().query(self.embed(observations), k, workers=self.workers)
+        # The tree drops the neighbor dimension when k is 1, so we make sure both arrays are 2D.
+        return np.reshape(distances, (len(observations), k)), np.reshape(indices, (len(observations), k))
+
+    # Returns a 2D numpy array where row i holds the indices of the k nearest rows to row i, not counting row i itself.
+    # The neighbors of each row are not in any particular order. For smaller data sets the distances from a block of
+    # rows to all rows are calculated with cdist and np.argpartition picks out the k smallest of each row. Larger data
+    # sets use the k-d tree instead, or the compiled knn_query for each row when the points have too many dimensions for
+    # the tree to help.
+    def leave_one_out_neighbors(self, k):
+        n = len(self.data)
+        k = min(k, n - 1)
+        if k <= 0:
+            return np.empty((n, 0), dtype=np.int64)
+        if n > LEAVE_ONE_OUT_MATRIX_MAX_ROWS and self.get_embed_dims() > KD_TREE_MAX_DIMS:
+            active = np.ones(n, dtype=np.bool_)
+            return np.array([self.knn_query(i, k, active) for i in range(n)], dtype=np.int64).reshape((n, k))
+        if n > LEAVE_ONE_OUT_MATRIX_MAX_ROWS:
+            indices = self.get_index().query(self.embed(self.data), k + 1, workers=self.workers)[1]
+            indices = np.reshape(indices, (n, k + 1))
+            # Each row is usually its own nearest neighbor, but when there are duplicate rows it may come later or not
+            # be found at all. A stable sort moves it to the end, and then the first k neighbors are kept.
+            is_self = indices == np.arange(n)[:, np.newaxis]
+            order = np.argsort(is_self, axis=1, kind='stable')
+            return np.take_along_axis(indices, order, axis=1)[:, :k]
+        num_matrix = self.get_num_matrix()
+        cat_matrix = self.get_cat_matrix()
+        neighbors = np.empty((n, k), dtype=np.int64)
+        for start in range(0, n, LEAVE_ONE_OUT_BLOCK_ROWS):
+            end = min(start + LEAVE_ONE_OUT_BLOCK_ROWS, n)
+            # The distances are only used to rank neighbors, so the square root is not needed.
+            distances = cdist(num_matrix[start:end], num_matrix, 'sqeuclidean')
+            if cat_matrix.shape[1]:
+                distances += cdist(cat_matrix[start:end], cat_matrix, 'hamming') * cat_matrix.shape[1]
+            # Row start + j of the data set is row j of the block, and it should never be its own neighbor.
+            distances[np.arange(end - start), np.arange(start, end)] = np.inf
+            neighbors[start:end] = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        return neighbors
+
+    # Returns the indices of the k nearest neighbors of the row at index i (not counting the row itself), from nearest
+    # to farthest. If 'active' is given, it is a boolean numpy array and only rows marked True are considered. This is
+    # meant for leave-one-out searches over the training data, where building a full distance matrix would be wasteful.
+    def knn_query(self, i, k, active=None):
+        # The kernel is imported here rather than at the top of the file, since importing numba is slow and most uses of
+        # the data set never need it.
+        import src.kernels as kernels
+        # The kernel assumes there is room for at least one neighbor.
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if active is None:
+            active = np.ones(len(self.data), dtype=np.bool_)
+        return kernels.knn_row(self.get_num_matrix(), self.get_cat_matrix(), active, i, k)
+
+    # Converts a list of observations into points for the k-d tree. The numeric attributes are kept as-is, and each
+    # string attribute is one-hot encoded (scaled by ONE_HOT_SCALE) using the categories of the data set. A string that
+    # is not one of the categories gets its own extra position so that it is still a distance of 1 from every other one.
+    def embed(self, observations):
+        num_matrix, cat_matrix = self.to_matrices(observations)
+        parts = [num_matrix]
+        for col, values in enumerate(self.get_categories()):
+            # The code -1 is used for unknown strings, which numpy indexing maps to the last (extra) position.
+            one_hot = np.zeros((len(observations), len(values) + 1))
+            one_hot[np.arange(len(observations)), cat_matrix[:, col]] = ONE_HOT_SCALE
+            parts.append(one_hot)
+        return np.hstack(parts)
+
+    # Returns the number of dimensions of the points produced by embed.
+    def get_embed_dims(self):
+        return len(self.get_num_attr_cols()) + sum(len(values) + 1 for values in self.get_categories())
+
+    # Returns a k-d tree over the rows of the data set (see embed), which answers nearest neighbor queries without
+    # calculating the distance to every row. The tree is built the first time it is needed.
+    def get_index(self):
+        if self._index is None:
+            self._index = cKDTree(self.embed(self.data))
+        return self._index
 
     # Returns the distance between two observations in the data set. Both a and b are observations that can be from the
     # data set or a completely new data point in the same format. The distance function is implemented here so that we
     # can take advantage of the knowledge of attribute columns (both string and non-string).
     def distance(self, a, b):
-        str_attr_cols = self.get_str_attr_cols()
+        return math.sqrt(self.distance_sq(a, b))
+
+    # Returns the squared distance between two observations. Since the square root does not change which of two
+    # distances is smaller, this should be used instead of distance whenever we only need to find the closest points.
+    def distance_sq(self, a, b):
+        num_attr_cols = self.get_num_attr_cols()
+        str_attr_cols = self.get_ordered_str_attr_cols()
+        if mixed_distance_sq is not None:
+            return mixed_distance_sq(a, b, num_attr_cols, str_attr_cols)
+        # The numeric and string columns each get their own loop, so there is no need to check a column's type.
         sum = 0
-        for attr_col in self.attr_cols:
-            if attr_col in str_attr_cols:
-                sum += 1 if a[attr_col] != b[attr_col] else 0
-            else:
-                sum += (a[attr_col] - b[attr_col])**2
-
-        return math.sqrt(sum)
+        for attr_col in num_attr_cols:
+            sum += (a[attr_col] - b[attr_col])**2
+        for attr_col in str_attr_cols:
+            if a[attr_col] != b[attr_col]:
+                sum += 1
+        return sum
 
     # Removes the first 'length' rows from the data. Use if there is header information.
     def remove_header(self, length):
         self.data = self.data[length:]
+        self._invalidate()
+        self._clear_col_types()
 
     # Used to handle data sets that involve discrete attribute values. The values in the attribute at the specified
     # column are converted using the given map from the original value to the new value. This is purposefully abstract
-    # in order for the DataSet class to work with numerous data sets.
+    # in order for the DataSet class to work with numerous data sets. Rows are shared between copies of a data set, so a
+    # row that changes is replaced with a new list rather than written into.
     def convert_attribute(self, col, value_map):
+        data = []
         for row in self.data:
             if row[col] in value_map:
+                row = list(row)
                 row[col] = value_map[row[col]]
+            data.append(row)
+        self.data = data
+        self._invalidate()
+        self._clear_col_types()
 
-    # Converts values in a specified set of columns (represented as indices) to floating point values.
+    # Converts values in a specified set of columns (represented as indices) to floating point values. Each row is
+    # replaced with a new list, since rows are shared between copies of a data set.
     def convert_to_float(self, cols):
-        for line in self.data:
-            for i in range(len(line)):
-                if i not in cols:
-                    continue
-                line[i] = float(line[i])
+        # numpy parses the whole block of values in one call, rather than calling float() on each value.
+        values = np.asarray([[row[col] for col in cols] for row in self.data], dtype=np.float64)
+        data = []
+        for row, row_values in zip(self.data, values.tolist()):
+            row = list(row)
+            for col, value in zip(cols, row_values):
+                row[col] = value
+            data.append(row)
+        self.data = data
+        self._invalidate()
+        self._clear_col_types()
 
     # Normalizes the values in a specified set of columns (represented as indices) to a z-score. For interpretation, the
     # new value in the data set represents how many standard deviations an attribute value is from the mean of the
     # attribute.
     def normalize_z_score(self, cols):
-        for col in cols:
-            # Calculate the mean of the column's data.
-            col_sum = 0
-            for row in self.data:
-                col_sum += row[col]
-            mean = col_sum / len(self.data)
-
-            # Calculate the standard deviation of the column's data.
-            sum_square_diffs = 0
-            for row in self.data:
-                sum_square_diffs += (mean - row[col])**2
-            standard_deviation = math.sqrt(sum_square_diffs)
-
-            # Replace each column value with it's z-score.
-            for row in self.data:
-                # If the standard deviation is 0, we just assign the z_score as 0 (no variation from mean).
-                z_score = 0
-                if standard_deviation != 0:
-                    # Otherwise we can use the standard calculation for z_scores.
-                    z_score = (row[col] - mean) / standard_deviation
+        # All of the columns are normalized at once as a single numpy matrix.
+        values = np.asarray([[row[col] for col in cols] for row in self.data], dtype=np.float64)
+        mean = values.mean(axis=0)
+        standard_deviation = values.std(axis=0)
+        # If the standard deviation is 0, we divide by 1 instead so that every z-score is 0 (no variation from mean).
+        standard_deviation[standard_deviation == 0] = 1
+        z_scores = (values - mean) / standard_deviation
+
+        # Copy the z-scores into new rows, since the old rows may be shared with copies of this data set.
+        data = []
+        for row, row_z_scores in zip(self.data, z_scores.tolist()):
+            row = list(row)
+            for col, z_score in zip(cols, row_z_scores):
                 row[col] = z_score
+            data.append(row)
+        self.data = data
+        self._invalidate()
+
+    # Rearranges the rows of the data to be the rows at the given indices (in that order). Any attribute matrices that
+    # were already built are rearranged the same way instead of being rebuilt.
+    def _reorder(self, indices):
+        self.data = [self.data[i] for i in indices]
+        if self._num_matrix is not None:
+            self._num_matrix = self._num_matrix[indices]
+            self._cat_matrix = self._cat_matrix[indices]
+            self._finalize()
+        # The k-d tree refers to rows by their position, so it has to be rebuilt.
+        self._index = None
+
+    # Restarts the random generator used by shuffle and sample from the given seed, so that they give the same results
+    # every run. A seed of None picks a new random starting point.
+    def set_seed(self, seed):
+        self._rng = np.random.default_rng(seed)
 
     # Shuffles the rows in the data randomly.
     def shuffle(self):
-        random.shuffle(self.data)
+        self._reorder(self._rng.permutation(len(self.data)))
+
+    # Returns a new data set holding just the rows at the given indices (in that order). The new data set shares the
+    # column types of this one and takes its attribute matrices as slices of ours, so they do not have to be rebuilt
+    # from the 2D list.
+    def subset(self, indices):
+        subset = DataSet([self.data[i] for i in indices], self.class_col, self.attr_cols, self.filename,
+                         workers=self.workers)
+        subset._rng = self._rng
+        subset._str_attr_cols = self.get_str_attr_cols()
+        subset._num_attr_cols = self.get_num_attr_cols()
+        subset._ordered_str_attr_cols = self.get_ordered_str_attr_cols()
+        subset._num_matrix = self.get_num_matrix()[indices]
+        subset._cat_matrix = self.get_cat_matrix()[indices]
+        subset._categories = self.get_categories()
+        subset._finalize()
+        return subset
 
     # Partitions the data set into two 2D lists. The first_percentage parameter specifies what proportion of
     # observations should fall into the first 2D list.
     def partition(self, first_percentage):
         cutoff = math.floor(first_percentage * len(self.data))
-        first = DataSet(self.data[:cutoff], self.class_col, self.attr_cols)
-        second = DataSet(self.data[cutoff:], self.class_col, self.attr_cols)
+        first = self.subset(np.arange(cutoff))
+        second = self.subset(np.arange(cutoff, len(self.data)))
         return first, second
 
     # Creates n-"folds" of our data set, which can be used for cross validation. Each fold has a test set, containing
     # 1/n of the data, and a training set, containing (n-1)/n of the data. Returns the list of folds.
     def validation_folds(self, n):
-        avg_size = len(self.data) / n
-        sections = []
-        for i in range(n):
-            section_data = None
-            # If we are in the final section, we make sure to take all elements to the very end of the data.
-            if i == n-1:
-                sections.append(self.data[math.floor(avg_size*i):])
-            # Otherwise, we use a normal range to create the data for the section.
-            else:
-                sections.append(self.data[math.floor(avg_size*i):math.floor(avg_size*(i+1))])
+        # Each section is stored as an array of row indices rather than a copy of the rows themselves. np.array_split
+        # divides the indices into n sections whose sizes differ by at most one, covering every row.
+        sections = np.array_split(np.arange(len(self.data)), n)
 
         folds = [{} for i in range(n)]
         for i in range(n):
-            folds[i]['test'] = DataSet(sections[i], self.class_col, self.attr_cols)
-            train = []
-            for j in range(n):
-                if i != j:
-                    train += sections[j]
-            folds[i]['train'] = DataSet(train, self.class_col, self.attr_cols)
+            folds[i]['test'] = self.subset(sections[i])
+            train = np.concatenate([sections[j] for j in range(n) if i != j])
+            folds[i]['train'] = self.subset(train)
         return folds
 
     # Used to randomly sample our data to only be of length k.
     def sample(self, k):
-        self.data = random.sample(self.data, k)
+        self._reorder(self._rng.choice(len(self.data), k, replace=False))
 
     # Prints the data set nicely.
     def print(self):
@@ -158,22 +465,63 @@ class DataSet:
 # The following functions are meant to handle the preprocessing of the data sets used in our experimental design.
 
 
-# Gets the abalone data set.
-def get_abalone_data():
-    data = util.read_file(ABALONE_DATA_FILE)
-    abalone_data = DataSet(data, 8, list(range(0, 8)), ABALONE_DATA_FILE)
+# Decorator for the functions below that read and preprocess a data set from the given data file. The preprocessed data
+# set is saved to a cache file the first time, and later runs load it from the cache as long as it is newer than the
+# data file. Within a single run, the data set is also kept in memory, so it is only ever loaded once. Every call
+# returns a copy of the data set, and since changing a value builds new rows, the data set kept in memory never changes.
+def cached_data_set(filename):
+    def decorator(load):
+        @functools.lru_cache(maxsize=None)
+        def cached_load():
+            cache_file = filename + CACHE_EXTENSION
+            if os.path.exists(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(filename):
+                try:
+                    data, extra = util.load_table(cache_file)
+                    if int(extra["version"]) == CACHE_VERSION:
+                        return DataSet(data, int(extra["class_col"]), extra["attr_cols"].tolist(), filename)
+                except (zipfile.BadZipFile, KeyError, ValueError, EOFError, OSError):
+                    # A damaged or unreadable cache is treated as missing, and is rewritten below.
+                    pass
+            data_set = load()
+            try:
+                util.save_table(cache_file, data_set.data, version=CACHE_VERSION, class_col=data_set.class_col,
+                                attr_cols=data_set.attr_cols)
+            except OSError:
+                # The cache is only an optimization, so we carry on if it cannot be written.
+                pass
+            return data_set
+
+        @functools.wraps(load)
+        def load_copy():
+            return cached_load().copy()
+        return load_copy
+    return decorator
+
+
+# Reads and preprocesses the abalone data set.
+@cached_data_set(ABALONE_DATA_FILE)
+def load_abalone_data():
     numeric_columns = list(range(1, 9))
-    # Convert attribute columns to floats
-    abalone_data.convert_to_float(numeric_columns)
+    # Attribute columns are read as floats
+    data = util.read_file(ABALONE_DATA_FILE, numeric_columns)
+    abalone_data = DataSet(data, 8, list(range(0, 8)), ABALONE_DATA_FILE)
     # Normalize values
     abalone_data.normalize_z_score(numeric_columns)
+    return abalone_data
+
+
+# Gets the abalone data set, shuffled randomly. A seed can be given to make the randomness reproducible.
+def get_abalone_data(seed=None):
+    abalone_data = load_abalone_data()
+    abalone_data.set_seed(seed)
     # Randomly shuffle values.
     abalone_data.shuffle()
     return abalone_data
 
 
-# Gets the car data set.
-def get_car_data():
+# Reads and preprocesses the car data set.
+@cached_data_set(CAR_DATA_FILE)
+def load_car_data():
     data = util.read_file(CAR_DATA_FILE)
     car_data = DataSet(data, 6, list(range(0, 6)), CAR_DATA_FILE)
     # Convert attribute columns to numeric scheme
@@ -186,68 +534,101 @@ def get_car_data():
     numeric_columns = list(range(0, 6))
     # Normalize values.
     car_data.normalize_z_score(numeric_columns)
+    return car_data
+
+
+# Gets the car data set, shuffled randomly. A seed can be given to make the randomness reproducible.
+def get_car_data(seed=None):
+    car_data = load_car_data()
+    car_data.set_seed(seed)
     # Randomly shuffle values.
     car_data.shuffle()
     return car_data
 
 
-# Gets the forest fires data set.
-def get_forest_fires_data():
-    data = util.read_file(FOREST_FIRE_DATA_FILE)
-    forest_fires_data = DataSet(data, 12, list(range(0, 12)), FOREST_FIRE_DATA_FILE)
+# Reads and preprocesses the forest fires data set.
+@cached_data_set(FOREST_FIRE_DATA_FILE)
+def load_forest_fires_data():
     numeric_columns = [0, 1] + list(range(4, 13))
-    # Remove the first line, which is the header info.
-    forest_fires_data.remove_header(1)
-    # Convert applicable columns to floats, including the class column.
-    forest_fires_data.convert_to_float([0, 1, 4, 5, 6, 7, 8, 9, 10, 11, 12])
+    # Skip the first line, which is the header info, and read applicable columns as floats, including the class column.
+    data = util.read_file(FOREST_FIRE_DATA_FILE, numeric_columns, skip_header=1)
+    forest_fires_data = DataSet(data, 12, list(range(0, 12)), FOREST_FIRE_DATA_FILE)
     # Normalize values.
     forest_fires_data.normalize_z_score([0, 1, 4, 5, 6, 7, 8, 9, 10, 11])
+    return forest_fires_data
+
+
+# Gets the forest fires data set, shuffled and sampled randomly. A seed can be given to make the randomness
+# reproducible.
+def get_forest_fires_data(seed=None):
+    forest_fires_data = load_forest_fires_data()
+    forest_fires_data.set_seed(seed)
     # Randomly shuffle values.
     forest_fires_data.shuffle()
     forest_fires_data.sample(250)
     return forest_fires_data
 
 
-def get_machine_data():
-    data = util.read_file(MACHINE_DATA_FILE)
+# Reads and preprocesses the machine data set.
+@cached_data_set(MACHINE_DATA_FILE)
+def load_machine_data():
+    # Read all columns except the first two as floats, including the class column.
+    data = util.read_file(MACHINE_DATA_FILE, range(2, 9))
     # There is another final column but we probably want to exclude it.
     machine_data = DataSet(data, 8, list(range(0, 8)), MACHINE_DATA_FILE)
-    # Convert all columns except the first two to floats, including the class column.
-    machine_data.convert_to_float(list(range(2, 9)))
     # Normalize values.
     machine_data.normalize_z_score(list(range(2, 8)))
+    return machine_data
+
+
+# Gets the machine data set, shuffled randomly. A seed can be given to make the randomness reproducible.
+def get_machine_data(seed=None):
+    machine_data = load_machine_data()
+    machine_data.set_seed(seed)
     # Randomly shuffle values.
     machine_data.shuffle()
     return machine_data
 
 
-# Gets the segmentation data set.
-def get_segmentation_data():
-    data = util.read_file(SEGMENTATION_DATA_FILE)
+# Reads and preprocesses the segmentation data set.
+@cached_data_set(SEGMENTATION_DATA_FILE)
+def load_segmentation_data():
     # Attribute columns are all numeric
     #  * Attribute #7, vedge-sd, removed because it is a standard deviation.
     #  * Attribute #9, hedge-sd, removed for same reason.
     attr_cols = [1, 2, 3, 4, 5, 6, 8, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19]
+    # Skip the first 5 lines, which is reserved for the header, and read all attribute columns as numeric values.
+    data = util.read_file(SEGMENTATION_DATA_FILE, attr_cols, skip_header=5)
     segmentation_data = DataSet(data, 0, attr_cols, SEGMENTATION_DATA_FILE)
-    # Remove the first 5 lines, which is reserved for the header.
-    segmentation_data.remove_header(5)
-    # Convert all attribute columns to numeric values.
-    segmentation_data.convert_to_float(attr_cols)
     # Normalize values.
     segmentation_data.normalize_z_score(attr_cols)
+    return segmentation_data
+
+
+# Gets the segmentation data set, shuffled randomly. A seed can be given to make the randomness reproducible.
+def get_segmentation_data(seed=None):
+    segmentation_data = load_segmentation_data()
+    segmentation_data.set_seed(seed)
     # Randomly shuffle values.
     segmentation_data.shuffle()
     return segmentation_data
 
 
-# Gets the wine data set.
-def get_wine_data():
-    data = util.read_file(WINE_DATA_FILE)
+# Reads and preprocesses the wine data set.
+@cached_data_set(WINE_DATA_FILE)
+def load_wine_data():
+    # Read all columns as numeric values.
+    data = util.read_file(WINE_DATA_FILE, range(0, 12))
     wine_data = DataSet(data, 11, list(range(0, 11)), WINE_DATA_FILE)
-    # Convert all attribute columns to numeric values.
-    wine_data.convert_to_float(list(range(0, 12)))
     # Normalize values.
     wine_data.normalize_z_score(list(range(0, 11)))
+    return wine_data
+
+
+# Gets the wine data set, shuffled randomly. A seed can be given to make the randomness reproducible.
+def get_wine_data(seed=None):
+    wine_data = load_wine_data()
+    wine_data.set_seed(seed)
     # Randomly shuffle values.
     wine_data.shuffle()
     return wine_data
@@ -1,7 +1,7 @@
 # driver.py
 # This is what we used to setup our experimental design. Running this as is will take hours, as it conducts
-# cross-validation for all algorithm and data set combinations. We use numpy and matplotlib as external libraries. See
-# the main function to understand the process used.
+# cross-validation for all algorithm and data set combinations. We use numpy, scipy, numba, joblib and
+# matplotlib as external libraries. See the main function to understand the process used.
 
 import src.loss as loss
 import src.datasets.data_set as ds
@@ -13,6 +13,29 @@ import src.algorithms.condensed_knn as c_knn
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+
+
+# Trains the given algorithm on one fold's training data and classifies every example in its test data. Returns the
+# list of results (the expected class and the algorithm's class distribution for each test example) along with the size
+# of the training data used by the algorithm. This is run in a separate process for each fold.
+def run_fold(alg_class, train, test, k):
+    # The folds already use every CPU core, so each fold's k-d tree searches stick to a single thread.
+    train.workers = 1
+    alg = alg_class(train, k)
+    # We want to run multiple test examples in bulk and store the results
+    results = []
+    for obs, actual in zip(test.data, alg.run_all(test.data)):
+        result = {"expected": obs[test.class_col], "actual": actual}
+        results.append(result)
+    return results, len(alg.training_data.data)
+
+
+# Runs every fold of cross validation in parallel across all CPU cores, since the folds are independent of each other.
+# Yields the output of run_fold for each fold, in order, as soon as it is available.
+def run_folds(alg_class, folds, k):
+    parallel = Parallel(n_jobs=-1, return_as="generator")
+    return parallel(delayed(run_fold)(alg_class, fold['train'], fold['test'], k) for fold in folds)
 
 
 # Runs the given algorithm on the data set for all values of k. The output is a map that stores various information,
@@ -41,26 +64,15 @@ def run_classification(alg_class, data_set, k_values):
         avg_training_size = 0
         print(" * Folds Complete: ", end='', flush=True)
 
-        # Iterate through each testing fold:
-        for fold_i, fold in enumerate(folds):
-            # Get the test and training data sets for the fold
-            test = fold['test']
-            train = fold['train']
-            alg = alg_class(train, k)
-
-            # We want to run multiple test examples in bulk and store the results
-            results = []
-            for obs in test.data:
-                result = {"expected": obs[data_set.class_col], "actual": alg.run(obs)}
-                results.append(result)
-
+        # Iterate through the results of each testing fold:
+        for fold_i, (results, training_size) in enumerate(run_folds(alg_class, folds, k)):
             # We then update the loss functions
             accuracy = loss.calc_accuracy(results)
             hinge_loss = loss.calc_hinge(results)
             avg_accuracy += accuracy / len(folds)
             avg_hinge_loss += hinge_loss / len(folds)
             # Also save the training data size
-            avg_training_size += len(alg.training_data.data) / len(folds)
+            avg_training_size += training_size / len(folds)
 
             print(fold_i+1, end='', flush=True)
             if fold_i == len(folds)-1:
@@ -102,21 +114,12 @@ def run_regression(alg_class, data_set, k_values):
         avg_huber_loss = 0
         avg_training_size = 0
         print(" * Folds Complete: ", end='', flush=True)
-        for fold_i, fold in enumerate(folds):
-            test = fold['test']
-            train = fold['train']
-            alg = alg_class(train, k)
-
-            results = []
-            for obs in test.data:
-                result = {"expected": obs[data_set.class_col], "actual": alg.run(obs)}
-                results.append(result)
-
+        for fold_i, (results, training_size) in enumerate(run_folds(alg_class, folds, k)):
             rmse = loss.calc_rmse(results)
             huber_loss = loss.calc_huber_loss(results)
             avg_rmse += rmse / len(folds)
             avg_huber_loss += huber_loss / len(folds)
-            avg_training_size += len(alg.training_data.data) / len(folds)
+            avg_training_size += training_size / len(folds)
             print(fold_i + 1, end='', flush=True)
             if fold_i == len(folds) - 1:
                 print()
@@ -303,4 +306,5 @@ def main():
     create_metric_chart(huber_pam)
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# kernels.py
+# Compiled (numba) versions of the hottest loops used by our algorithms. These work directly on the numpy matrices kept
+# by the DataSet class instead of on the 2D list of observations.
+import numpy as np
+from numba import njit, prange
+
+
+# Finds the k nearest neighbors of the row at index query_i, using the numeric matrix and a matrix of integer codes for
+# the string attributes. Only rows marked as True in 'active' are considered, and the query row never counts as its own
+# neighbor. Returns the indices of the neighbors, from nearest to farthest (there may be fewer than k if not enough rows
+# are active). The distances are compared squared, since the square root does not change their order.
+@njit(parallel=True, fastmath=True, cache=True)
+def knn_row(num_matrix, cat_matrix, active, query_i, k):
+    n = num_matrix.shape[0]
+    distances = np.empty(n)
+    # The distance to every row is independent, so they are calculated in parallel.
+    for i in prange(n):
+        dist = 0.0
+        for j in range(num_matrix.shape[1]):
+            diff = num_matrix[i, j] - num_matrix[query_i, j]
+            dist += diff * diff
+        for j in range(cat_matrix.shape[1]):
+            if cat_matrix[i, j] != cat_matrix[query_i, j]:
+                dist += 1.0
+        distances[i] = dist
+
+    # The k smallest distances are kept in a sorted buffer. Each new candidate is inserted into place, which avoids
+    # sorting all n distances when only k of them are needed.
+    nearest = np.empty(k, dtype=np.int64)
+    nearest_dists = np.empty(k)
+    count = 0
+    for i in range(n):
+        if not active[i] or i == query_i:
+            continue
+        dist = distances[i]
+        if count < k:
+            pos = count
+            count += 1
+        elif dist < nearest_dists[k - 1]:
+            pos = k - 1
+        else:
+            continue
+        # Shift farther neighbors back until we find the position of the new one. Ties keep the earlier row first.
+        while pos > 0 and nearest_dists[pos - 1] > dist:
+            nearest_dists[pos] = nearest_dists[pos - 1]
+            nearest[pos] = nearest[pos - 1]
+            pos -= 1
+        nearest_dists[pos] = dist
+        nearest[pos] = i
+    return nearest[:count]
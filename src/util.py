@@ -1,25 +1,21 @@
 # util.py
 # These are general utility functions that are useful across all of our algorithms/code.
 import csv
+import itertools
 import operator as op
+import os
+import tempfile
+import numpy as np
 
 
 # Calculates the class distribution of a 2D list of data. The distribution is stored in a dictionary that maps each
 # class to the proportion of examples in 'data' that have that class.
 def calculate_class_distribution(data, class_col):
     n = len(data)
-    # This is our map of each class to its probability/proportion:
-    probs = {}
-    for obs in data:
-        class_val = obs[class_col]
-        # We either update the probabilities if the class was already present, or initialize the probability if not.
-        # Note that we divide by n here in order to prevent having to do it in a future iteration of the probability
-        # map.
-        if class_val in probs:
-            probs[class_val] += 1 / n
-        else:
-            probs[class_val] = 1 / n
-    return probs
+    # numpy counts every class in a single pass over the class column. We then divide all of the counts by n at once to
+    # get our map of each class to its probability/proportion.
+    classes, counts = np.unique([obs[class_col] for obs in data], return_counts=True)
+    return dict(zip(classes.tolist(), (counts / n).tolist()))
 
 # This function takes in a probability distribution, outputs the class corresponding to the maximum probability. This
 # would essentially return our "guess" for the class of an observation.
@@ -28,15 +24,46 @@ def get_highest_class(classes:dict) -> str:
     return max(classes.items(), key=op.itemgetter(1))[0]
 
 
-# Creates a 2D list from a file.
-def read_file(filename):
-    with open(filename) as csvfile:
-        data = list(csv.reader(csvfile))
-    empty_removed = []
-    for line in data:
-        if line:
-            empty_removed.append(line)
-    return empty_removed
+# Creates a 2D list from a comma separated file. The values in the columns listed in float_cols are parsed as floats,
+# while all other values are left as strings. The first skip_header lines of the file (including any blank lines) are
+# skipped, and blank lines elsewhere are ignored. The lines are split by the csv module, so quoted values and rows of
+# different lengths are handled as usual, but the float columns are converted together by numpy rather than one value
+# at a time.
+def read_file(filename, float_cols=(), skip_header=0):
+    with open(filename, newline='') as csvfile:
+        rows = [line for line in csv.reader(itertools.islice(csvfile, skip_header, None)) if line]
+    float_cols = list(float_cols)
+    if not float_cols or not rows:
+        return rows
+    values = np.asarray([[line[col] for col in float_cols] for line in rows], dtype=np.float64)
+    for line, line_values in zip(rows, values.tolist()):
+        for col, value in zip(float_cols, line_values):
+            line[col] = value
+    return rows
+
+
+# Saves a 2D list to a numpy .npz file, storing each column as its own numpy array (of floats or strings). Any extra
+# keyword arguments are saved alongside the columns. This is much faster to load than parsing the original file. The
+# table is first written to a temporary file in the same directory, which then replaces the file in one step, so an
+# interrupted save never leaves a partly written file behind.
+def save_table(filename, data, **extra):
+    columns = {"col" + str(i): np.asarray([row[i] for row in data]) for i in range(len(data[0]))}
+    fd, temp_filename = tempfile.mkstemp(suffix=".npz", dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            np.savez(temp_file, num_cols=len(columns), **columns, **extra)
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.remove(temp_filename)
+        raise
+
+
+# Loads a 2D list saved by save_table. Returns the 2D list and a dictionary of the extra arrays that were saved with it.
+def load_table(filename):
+    with np.load(filename) as table:
+        columns = [table["col" + str(i)].tolist() for i in range(int(table["num_cols"]))]
+        extra = {key: table[key] for key in table.files if key != "num_cols" and not key.startswith("col")}
+    return [list(row) for row in zip(*columns)], extra
 
 
 # Counts the frequency of each class in the 2D list of data. Returns a map of each class to a count of the number of
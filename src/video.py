@@ -142,11 +142,10 @@ def test_pam_nn():
     print()
 
 
-# Returns our simplified data set.
-def get_three_clusters_data():
-    data = util.read_file(THREE_CLUSTERS_DATA_FILE)
-    three_clusters_data = ds.DataSet(data, 2, [0, 1], THREE_CLUSTERS_DATA_FILE)
-    three_clusters_data.convert_to_float([0, 1])
+# Returns our simplified data set, shuffled randomly. A seed can be given to make the randomness reproducible.
+def get_three_clusters_data(seed=None):
+    data = util.read_file(THREE_CLUSTERS_DATA_FILE, [0, 1])
+    three_clusters_data = ds.DataSet(data, 2, [0, 1], THREE_CLUSTERS_DATA_FILE, seed=seed)
     three_clusters_data.shuffle()
     return three_clusters_data
 